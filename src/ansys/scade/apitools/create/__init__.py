@@ -136,6 +136,7 @@ from .scade import (  # noqa: F401
     add_element_to_project,
     add_imported_to_project,
     add_simulation_file_to_project,
+    deferred_links,
     save_all,
 )
 from .type import create_sized, create_structure, create_table  # noqa: F401
@@ -28,6 +28,8 @@ Provides create functions for Scade operator definitions.
 """
 
 from enum import Enum
+from functools import lru_cache
+from itertools import chain
 from typing import List, Tuple, Union
 
 import scade.model.suite as suite
@@ -39,6 +41,15 @@ from .project import _check_object
 from .scade import _link_pendings, _set_modified
 from .type import TX, _build_type, _object_link_type
 
+_diagram_classes = (suite.NetDiagram, suite.TextDiagram)
+"""Classes of the diagrams a flow can be added to."""
+
+_embedded_scope_classes = (suite.Action, suite.State)
+"""Classes of the scopes with an embedded representation in a diagram."""
+
+_if_owner_classes = (suite.IfBlock, suite.IfNode)
+"""Classes of the owners of an if node."""
+
 # ----------------------------------------------------------------------------
 # interface
 
@@ -60,13 +71,16 @@ def add_data_def_signals(data_def: suite.DataDef, names: List[str]) -> List[suit
         List of added signals.
     """
     _check_object(data_def, 'add_data_def_signals', 'data_def', suite.DataDef)
+    if not names:
+        # nothing to do: the scope is not modified
+        return []
 
     signals = []
     for name in names:
         signal = suite.LocalVariable(data_def)
         signal.name = name
-        data_def.signals.append(signal)
         signals.append(signal)
+    data_def.signals.extend(signals)
 
     _set_modified(data_def)
     return signals
@@ -79,17 +93,26 @@ def _add_data_def_variables(
     """Core function to create scope local variables."""
     proc_name = '_add_data_def_variables'
     _check_object(data_def, proc_name, 'datadef', suite.DataDef)
+    if not vars:
+        # nothing to do: the scope is not modified
+        return []
 
+    # local bindings for the loop, which may create many variables
+    local_variable_class = suite.LocalVariable
     variables = []
+    append = variables.append
     for name, tree in vars:
         type_ = _build_type(tree, data_def)
-        variable = suite.LocalVariable(data_def)
+        variable = local_variable_class(data_def)
         variable.name = name
-        variable.probe = probe
-        data_def.locals.append(variable)
+        if probe:
+            # False by default
+            variable.probe = True
         _object_link_type(variable, type_)
-        variables.append(variable)
+        append(variable)
 
+    # no exception raised: add the variables to their owner
+    data_def.locals.extend(variables)
     _link_pendings()
     _set_modified(data_def)
     return variables
@@ -212,10 +235,10 @@ def _add_data_def_diagram(data_def: suite.DataDef, class_: type, name: str) -> s
     diagram = class_(data_def)
     diagram.name = name
     data_def.diagrams.append(diagram)
-    if isinstance(data_def, (suite.Action, suite.State)):
+    if isinstance(data_def, _embedded_scope_classes):
         # the display of the scope is no longer embedded
         if data_def.presentation_element:
-            data_def.presentation_element.display = DK.SPLIT.value
+            data_def.presentation_element.display = _display_values[DK.SPLIT]
 
     _set_modified(data_def)
     return diagram
@@ -265,31 +288,62 @@ def add_data_def_net_diagram(data_def: suite.DataDef, name: str) -> suite.NetDia
 # equations and edges
 
 
+@lru_cache(maxsize=4096, typed=True)
+def _coord_to_str(value: Union[int, float]) -> str:
+    """
+    Cache the string representation of a coordinate.
+
+    The coordinates are usually taken from a small set of values, for example
+    multiples of 100. The cache considers the type of the value so that ``0``
+    and ``0.0`` are not confused.
+    """
+    return str(value)
+
+
+@lru_cache(maxsize=4096, typed=True)
+def _coords_to_str(*values: Union[int, float]) -> Tuple[str, ...]:
+    """
+    Cache the string representations of coordinates.
+
+    The positions and sizes are often the same, for example ``(0, 0)``. The cache
+    considers the types of the values so that ``0`` and ``0.0`` are not confused.
+    """
+    return tuple(map(_coord_to_str, values))
+
+
 def _num_to_str(values: List[Union[int, float]]) -> List[str]:
     """SCADE graphical coordinates are strings: position, size, points."""
-    return [str(_) for _ in values]
+    return list(_coords_to_str(*values))
+
+
+def _points_to_str(points: List[Tuple[Union[int, float], Union[int, float]]]) -> List[str]:
+    """Flatten a list of points to SCADE graphical coordinates in a single pass."""
+    return list(map(_coord_to_str, chain.from_iterable(points)))
+
+
+_default_points = ('0', '0', '0', '0')
+"""Default points of an edge, computed by the SCADE Editor when the model is loaded."""
 
 
 def _create_internal(data_def: suite.DataDef, tree: TX) -> suite.LocalVariable:
     """
     Create an internal variable for an operator.
 
-    Notes
-    -----
-    The algorithm is inefficient. You should compute the name
-    of the internal variables with a cache in the client code.
-
+    The name of the variable is the first available name ``_L<n>``,
+    starting from the number of existing internal variables.
     """
+    internals = data_def.internals
+    names = {_.name for _ in internals}
     # default name for the internal variable
-    index = len(data_def.internals) + 1
-    name = '_L' + str(index)
-    while next((_ for _ in data_def.internals if _.name == name), None) is not None:
+    index = len(internals) + 1
+    name = '_L%d' % index
+    while name in names:
         index = index + 1
-        name = '_L' + str(index)
+        name = '_L%d' % index
 
     variable = suite.LocalVariable(data_def)
     variable.name = name
-    data_def.internals.append(variable)
+    internals.append(variable)
     _object_link_type(variable, _build_type(tree, data_def))
 
     _link_pendings()
@@ -311,6 +365,9 @@ def add_data_def_equation(
     """
     Create an equation in a scope.
 
+    When creating many equations, for example from a script, enclose the calls
+    in a ``deferred_links`` block to resolve the links of the new objects once.
+
     Parameters
     ----------
     data_def : suite.DataDef
@@ -348,18 +405,19 @@ def add_data_def_equation(
     """
     _check_object(data_def, 'add_data_def_equation', 'datadef', suite.DataDef)
     if diagram is not None:
-        _check_object(
-            diagram, 'add_data_def_equation', 'diagram', (suite.NetDiagram, suite.TextDiagram)
-        )
-    else:
+        _check_object(diagram, 'add_data_def_equation', 'diagram', _diagram_classes)
+    elif __debug__:
         # internal variables allowed only for graphical diagrams
-        [
-            _check_object(_, 'add_data_def_equation', 'lefts', suite.LocalVariable)
-            for _ in lefts
-            if _ != '_'
-        ]
+        # (the loop is removed with -O, like the checks)
+        for left in lefts:
+            if left != '_':
+                _check_object(left, 'add_data_def_equation', 'lefts', suite.LocalVariable)
 
     equation = suite.Equation(data_def)
+    # local bindings for the loop
+    local_variable_class = suite.LocalVariable
+    variables = []
+    append = variables.append
     for left in lefts:
         if left == '_':
             variable = suite.Variable(data_def)
@@ -367,21 +425,23 @@ def add_data_def_equation(
             # TODO: raise an error if len(lefts) != 1
             equation.terminator = True
         else:
-            if isinstance(left, suite.LocalVariable):
+            if isinstance(left, local_variable_class):
                 # left is an existing local variable
                 variable = left
             else:
                 # left is expected to be a type tree
                 variable = _create_internal(data_def, left)
 
-        equation.lefts.append(variable)
+        append(variable)
+    equation.lefts.extend(variables)
 
     equation.right = _build_expression(right, data_def)
 
     # graphical part
     if diagram and not isinstance(data_def, suite.Operator):
         pe = data_def.presentation_element
-        if not pe or pe.display == DK.TEXTUAL:
+        # compare the display of the scope with the value of the display kind
+        if not pe or pe.display == _display_values[DK.TEXTUAL]:
             # ignore the graphical information
             diagram = None
     if diagram is not None:
@@ -415,6 +475,7 @@ def add_diagram_edge(
     dst: suite.Equation,
     expr: Union[int, suite.Expression],
     points: List[Tuple[int, int]] = None,
+    left_index: int = None,
 ) -> suite.Edge:
     """
     Add a graphical edge between two equations in a graphical diagram.
@@ -448,45 +509,78 @@ def add_diagram_edge(
         Coordinates of the segments composing the edge, expressed in 1/100th of mm.
         When ``None``, the value is set to ``[(0, 0), (0, 0)]`` so that the SCADE Editor
         computes default positions when the model is loaded.
+    left_index : int, default: None
+        Index of the local variable in the left variables of the source equation.
+        When ``None``, the index is searched in the source equation. Providing it
+        saves a linear search when the caller already knows it, for example when
+        adding many edges. A ``ValueError`` is raised if it does not designate
+        ``left``, except when Python runs with optimizations, ``-O``.
 
     Returns
     -------
     suite.Edge
     """
-    _check_object(diagram, 'add_data_def_edge', 'diagram', suite.NetDiagram)
-    _check_object(src, 'add_data_def_edge', 'src', suite.Equation)
-    _check_object(dst, 'add_data_def_edge', 'dst', suite.Equation)
-    _check_object(left, 'add_data_def_edge', 'left', suite.LocalVariable)
-    if isinstance(expr, int):
-        # searches the equation for the corresponding expression
-        index = expr
-        expr = _find_expr_id(dst.right, index)
-    _check_object(expr, 'add_data_def_edge', 'expr', suite.ExprId)
+    if __debug__:
+        # called for each edge: removed with -O, like the checks
+        _check_object(diagram, 'add_data_def_edge', 'diagram', suite.NetDiagram)
+        _check_object(src, 'add_data_def_edge', 'src', suite.Equation)
+        _check_object(dst, 'add_data_def_edge', 'dst', suite.Equation)
+        _check_object(left, 'add_data_def_edge', 'left', suite.LocalVariable)
+    if not isinstance(expr, suite.ExprId):
+        # most common case first: the expression is usually provided
+        if isinstance(expr, int):
+            # searches the equation for the corresponding expression
+            index = expr
+            expr = _find_expr_id(dst.right, index)
+        _check_object(expr, 'add_data_def_edge', 'expr', suite.ExprId)
 
     # a flow is only graphical
-    pesrc = src.presentation_element
-    pedst = dst.presentation_element
-    diagram = pesrc.diagram
-    edge = suite.Edge(diagram)
+    diagram = src.presentation_element.diagram
+    if left_index is None:
+        left_index = src.lefts.index(left)
+    elif __debug__:
+        # removed with -O, like the checks
+        lefts = src.lefts
+        if not 0 <= left_index < len(lefts) or lefts[left_index] != left:
+            raise ValueError(
+                'add_data_def_edge: %s: Illegal left index %d' % (left.name, left_index)
+            )
+    edge = _create_diagram_edge(diagram, src, left_index, left, dst, expr, points)
     diagram.presentation_elements.append(edge)
-    edge.src_equation = pesrc
-    edge.dst_equation = pedst
+
+    _set_modified(diagram.data_def)
+    return edge
+
+
+def _create_diagram_edge(
+    diagram: suite.NetDiagram,
+    src: suite.Equation,
+    index: int,
+    left: suite.LocalVariable,
+    dst: suite.Equation,
+    expr: suite.ExprId,
+    points: List[Tuple[int, int]] = None,
+) -> suite.Edge:
+    """
+    Core function to create an edge, with the index of the variable in the source's lefts.
+
+    The edge is not added to the diagram, to allow adding several edges at once.
+    """
+    edge = suite.Edge(diagram)
+    edge.src_equation = src.presentation_element
+    edge.dst_equation = dst.presentation_element
     edge.left_var = left
     edge.right_expression = expr
 
-    variables = src.lefts
-    index = variables.index(left)
     # 1 based index
     edge.left_var_index = index + 1
 
     # graphical properties
     if not points:
-        values = [0] * 4
+        edge.points = list(_default_points)
     else:
-        values = [_ for point in points for _ in point]
-    edge.points = _num_to_str(values)
+        edge.points = _points_to_str(points)
 
-    _set_modified(diagram.data_def)
     return edge
 
 
@@ -504,37 +598,64 @@ def add_diagram_missing_edges(diagram: suite.NetDiagram) -> List[suite.Edge]:
     List[suite.Edge]
     """
     _check_object(diagram, 'add_missing_edges', 'diagram', suite.NetDiagram)
-
-    # cache the existing edges
-    cache = {
-        (_.left_var, _.right_expression)
-        for _ in diagram.presentation_elements
-        if isinstance(_, suite.Edge)
-    }
-    # find the not connected expressions of the graphical equations
-    pairs = set()
+    # the references of the equations created in a deferred_links block
+    # must be set to find their edges
+    _link_pendings(force=True)
+
+    # cache the existing edges and gather the graphical equations in a single pass
+    cache = set()
+    equations = []
+    # loop invariants
+    edge_class = suite.Edge
+    equation_ge_class = suite.EquationGE
     for pe in diagram.presentation_elements:
-        if isinstance(pe, suite.EquationGE) and pe.kind == 'FI_EQUATION':
+        if isinstance(pe, edge_class):
+            cache.add((pe.left_var, pe.right_expression))
+        elif isinstance(pe, equation_ge_class) and pe.kind == 'FI_EQUATION':
             # not a textual expression
-            pairs |= {(_.reference, _) for _ in pe.equation.right.sub_expr_ids if _.reference}
-    pairs -= cache
+            equations.append(pe.equation)
+    # find the not connected expressions of the graphical equations,
+    # with their owning equation
+    pairs = {}
+    for equation in equations:
+        for expr in equation.right.sub_expr_ids:
+            left = expr.reference
+            if left and (left, expr) not in cache:
+                pairs[(left, expr)] = equation
     # create the graphical edges
     edges = []
-    for left, expr in pairs:
-        # get the owning equation of the expression
-        dst = expr.owner
-        while not isinstance(dst, suite.Equation):
-            dst = dst.owner
-        # find the first equation defining the variable,
+    # indexes of the left variables of the source equations
+    indexes = {}
+    # equations defining a variable in a scope and in the diagram
+    definitions = {}
+    for (left, expr), dst in pairs.items():
+        # find the equations defining the variable,
         # in the same scope/diagram
-        for src in left.definitions:
-            pe = src.presentation_element
-            if src.data_def != dst.data_def or not pe or pe.diagram != diagram:
-                continue
+        data_def = dst.data_def
+        srcs = definitions.get((left, data_def))
+        if srcs is None:
+            srcs = []
+            for src in left.definitions:
+                if src.data_def != data_def:
+                    continue
+                # read the presentation element once
+                pe = src.presentation_element
+                if pe and pe.diagram == diagram:
+                    srcs.append(src)
+            definitions[(left, data_def)] = srcs
+        for src in srcs:
+            lefts = indexes.get(src)
+            if lefts is None:
+                lefts = {var: index for index, var in enumerate(src.lefts)}
+                indexes[src] = lefts
             # create the edge
-            edge = add_diagram_edge(diagram, src, left, dst, expr)
+            edge = _create_diagram_edge(diagram, src, lefts[left], left, dst, expr)
             edges.append(edge)
 
+    if edges:
+        # add all the edges at once
+        diagram.presentation_elements.extend(edges)
+        _set_modified(diagram.data_def)
     return edges
 
 
@@ -585,14 +706,12 @@ def add_data_def_assertion(
     """
     _check_object(data_def, 'add_data_def_assertion', 'datadef', suite.DataDef)
     if diagram:
-        _check_object(
-            diagram, 'add_data_def_assertion', 'diagram', (suite.NetDiagram, suite.TextDiagram)
-        )
+        _check_object(diagram, 'add_data_def_assertion', 'diagram', _diagram_classes)
 
     assertion = suite.Assertion(data_def)
     assertion.name = name
     assertion.expression = _build_expression(expr, data_def)
-    assertion.assume = kind == AK.ASSUME
+    assertion.assume = kind is AK.ASSUME
 
     data_def.flows.append(assertion)
 
@@ -653,9 +772,7 @@ def add_data_def_state_machine(
     """
     _check_object(data_def, 'add_data_def_state_machine', 'data_def', suite.DataDef)
     if diagram is not None:
-        _check_object(
-            diagram, 'add_data_def_state_machine', 'diagram', (suite.NetDiagram, suite.TextDiagram)
-        )
+        _check_object(diagram, 'add_data_def_state_machine', 'diagram', _diagram_classes)
 
     sm = suite.StateMachine(data_def)
     sm.name = name
@@ -698,6 +815,15 @@ class DK(Enum):
     SPLIT = 'Split'
 
 
+_display_values = {_: _.value for _ in DK}
+"""
+Values of the display kinds.
+
+* The key is a display kind.
+* The value is the corresponding string for the display attribute of a presentation element.
+"""
+
+
 def add_state_machine_state(
     sm: suite.StateMachine,
     name: str,
@@ -736,9 +862,9 @@ def add_state_machine_state(
 
     state = suite.State(sm)
     state.name = name
-    if kind == SK.INITIAL:
+    if kind is SK.INITIAL:
         state.initial = True
-    elif kind == SK.FINAL:
+    elif kind is SK.FINAL:
         state.final = True
 
     sm.states.append(state)
@@ -751,9 +877,9 @@ def add_state_machine_state(
         # graphical properties
         pe.position = _num_to_str(position)
         pe.size = _num_to_str(size)
-        if display == DK.SPLIT:
+        if display is DK.SPLIT:
             add_data_def_net_diagram(state, state.name)
-        pe.display = display.value
+        pe.display = _display_values[display]
         state.presentation_element = pe
         diagram.presentation_elements.append(pe)
     # no presentation elements for text diagrams: only for owning state machine
@@ -954,54 +1080,77 @@ def add_state_transition(state: suite.State, kind: TK, tree: TR) -> suite.Transi
     return transition
 
 
-def _build_transition(src: Union[suite.State, suite.Transition], tree: TR) -> suite.Transition:
-    """Build a transition from the intermediate tree."""
-    _check_object(src, '_build_transition', 'src', (suite.State, suite.Transition))
+def _build_transition(src: suite.State, tree: TR) -> suite.Transition:
+    """Build a main transition and its forked transitions from the intermediate tree."""
+    _check_object(src, '_build_transition', 'src', suite.State)
 
-    if isinstance(src, suite.State):
-        # main transition
-        transition = suite.MainTransition(src)
-        src.outgoings.append(transition)
-    else:
-        # forked transition
-        transition = suite.ForkedTransition(src)
-        src.forked_transitions.append(transition)
-
-    if tree.trigger is None:
-        transition._else = True
-    else:
-        transition.condition = _build_expression(tree.trigger, src)
-    # do not create automatically an action: this is the behavior of the SCADE Editor
-    # transition.effect = suite.Action(transition)
-    transition.priority = tree.priority
-
-    # graphical part
+    # graphical part: the forked transitions are in the same diagram as the main one
     pesrc = src.presentation_element
     diagram = pesrc.diagram if pesrc is not None else None
-    pe = None  # default
-    if isinstance(diagram, suite.NetDiagram):
-        pe = suite.TransitionGE(diagram.data_def)
-        # graphical properties
-        values = [_ for point in tree.points for _ in point]
-        pe.points = _num_to_str(values)
-        pe.label_position = _num_to_str(tree.label_position)
-        pe.label_size = _num_to_str(tree.label_size)
-        pe.slash_position = _num_to_str(tree.slash_position)
-        pe.polyline = tree.polyline
-        transition.presentation_element = pe
-        diagram.presentation_elements.append(pe)
-    # no presentation elements for text diagrams: only for owning state machine
-
-    td = tree.target
-    if isinstance(td, _State):
-        transition.target = td.state
-        transition.reset_target = td.reset
+    if not isinstance(diagram, suite.NetDiagram):
+        # no presentation elements for text diagrams: only for owning state machine
+        diagram = None
     else:
-        assert isinstance(td, _Fork)
-        for fork in td.transitions:
-            _build_transition(transition, fork)
+        # loop invariants
+        data_def = diagram.data_def
+        transition_ge = suite.TransitionGE
+
+    root = None
+    # presentation elements, added to the diagram at once
+    pes = []
+    # pairs (transition, forked transitions), the forks are added at once to their source
+    forks = []
+    # explicit stack instead of recursion for the forked transitions:
+    # tuples (source, tree, siblings) to build, the next one at the end of the list
+    stack = [(src, tree, None)]
+    while stack:
+        src, tree, siblings = stack.pop()
+        if siblings is not None:
+            # forked transition
+            transition = suite.ForkedTransition(src)
+            siblings.append(transition)
+        else:
+            # root of the tree: main transition
+            transition = suite.MainTransition(src)
+            src.outgoings.append(transition)
+            root = transition
 
-    return transition
+        if tree.trigger is None:
+            transition._else = True
+        else:
+            transition.condition = _build_expression(tree.trigger, src)
+        # do not create automatically an action: this is the behavior of the SCADE Editor
+        # transition.effect = suite.Action(transition)
+        transition.priority = tree.priority
+
+        # graphical part
+        if diagram is not None:
+            pe = transition_ge(data_def)
+            # graphical properties
+            pe.points = _points_to_str(tree.points)
+            pe.label_position = _num_to_str(tree.label_position)
+            pe.label_size = _num_to_str(tree.label_size)
+            pe.slash_position = _num_to_str(tree.slash_position)
+            pe.polyline = tree.polyline
+            transition.presentation_element = pe
+            pes.append(pe)
+
+        td = tree.target
+        if isinstance(td, _State):
+            transition.target = td.state
+            transition.reset_target = td.reset
+        else:
+            assert isinstance(td, _Fork)
+            siblings = []
+            forks.append((transition, siblings))
+            # reverse order so that the forked transitions are created in sequence
+            stack.extend((transition, fork, siblings) for fork in reversed(td.transitions))
+
+    for transition, siblings in forks:
+        transition.forked_transitions.extend(siblings)
+    if pes:
+        diagram.presentation_elements.extend(pes)
+    return root
 
 
 def add_transition_equation(
@@ -1033,10 +1182,23 @@ def add_transition_equation(
     _check_object(transition, 'add_transition_equation', 'transition', suite.Transition)
 
     # make sure the transition has a scope
-    if not transition.effect:
-        transition.effect = suite.Action(transition)
+    effect = _ensure_transition_effect(transition)
 
-    return add_data_def_equation(transition.effect, None, lefts, right)
+    return add_data_def_equation(effect, None, lefts, right)
+
+
+def _ensure_transition_effect(transition: suite.Transition) -> suite.Action:
+    """
+    Return the scope of a transition, created if it does not exist.
+
+    The transitions do not have a scope by default: this is the behavior
+    of the SCADE Editor.
+    """
+    effect = transition.effect
+    if not effect:
+        effect = suite.Action(transition)
+        transition.effect = effect
+    return effect
 
 
 # ----------------------------------------------------------------------------
@@ -1046,17 +1208,15 @@ def add_transition_equation(
 class IfTree:
     """Provides an intermediate structure for describing the structure of an if block."""
 
+    # the trees can be large: no dictionary per instance
+    __slots__ = ('position', 'name')
+
     def __init__(self, position: Tuple[float, float] = None):
         """Store the attributes."""
         self.position = position if position else (0, 0)
         # name to be used if a diagram needs to be created
         self.name = None
 
-    def _build(self, context: suite.Object, diagram: suite.Diagram) -> suite.IfBranch:
-        """Build an if branch from the tree."""
-        # must be overridden
-        assert False  # pragma no cover
-
 
 IT = IfTree
 """Short name for an ``IfTree`` instance to simplify the declarations."""
@@ -1065,6 +1225,8 @@ IT = IfTree
 class _Node(IT):
     """Provides an intermediate structure to describe a decision of an if tree."""
 
+    __slots__ = ('expression', 'then', 'else_', 'label_width')
+
     def __init__(
         self,
         expression: EX,
@@ -1082,30 +1244,12 @@ class _Node(IT):
         self.else_.name = 'Else'
         self.label_width = label_width
 
-    def _build(self, owner: suite.Object, diagram: suite.Diagram) -> suite.IfBranch:
-        """Build an if node from the tree."""
-        _check_object(owner, '_build', 'owner', (suite.IfBlock, suite.IfNode))
-
-        node = suite.IfNode(owner)
-        node.expression = _build_expression(self.expression, node)
-        node.then = self.then._build(node, diagram)
-        node._else = self.else_._build(node, diagram)
-
-        # graphical part
-        if isinstance(diagram, suite.NetDiagram):
-            pe = suite.IfNodeGE(diagram.data_def)
-            # graphical properties
-            pe.position = _num_to_str(self.position)
-            pe.label_width = self.label_width
-            node.presentation_element = pe
-            diagram.presentation_elements.append(pe)
-
-        return node
-
 
 class _Action(IT):
     """Provides the leaf action of an if tree."""
 
+    __slots__ = ('size', 'display')
+
     def __init__(
         self,
         position: Tuple[float, float] = None,
@@ -1117,26 +1261,92 @@ class _Action(IT):
         self.size = size if size else (0, 0)
         self.display = display
 
-    def _build(self, owner: suite.Object, diagram: suite.Diagram) -> suite.IfBranch:
-        """Build an if action from the tree."""
-        _check_object(owner, '_build', 'owner', suite.IfNode)
 
-        ia = suite.IfAction(owner)
-        ia.action = suite.Action(owner)
+def _build_if_tree(tree: IfTree, owner: suite.IfBlock, diagram: suite.Diagram) -> suite.IfBranch:
+    """
+    Build the if nodes and actions of an if block from the tree.
 
-        # graphical part
-        if isinstance(diagram, suite.NetDiagram):
-            pe = suite.ActionGE(diagram.data_def)
-            # graphical properties
-            pe.position = _num_to_str(self.position)
-            pe.size = _num_to_str(self.size)
-            if self.display == DK.SPLIT:
-                add_data_def_net_diagram(ia.action, self.name)
-            pe.display = self.display.value
-            ia.action.presentation_element = pe
-            diagram.presentation_elements.append(pe)
+    The tree is traversed with an explicit stack instead of recursion, so
+    that the depth of the decision trees is not limited.
+    """
+    # the parents of the other branches are the if nodes created below
+    classes = _if_owner_classes if isinstance(tree, _Node) else suite.IfNode
+    _check_object(owner, '_build_if_tree', 'owner', classes)
+
+    # first pass: create the branches in pre-order, then before else
+    branches = []
+    # indexes of the sub-branches of each branch in the list, then before else
+    children = []
+    # tuples (tree, parent, role, index of the parent), the next one at the end of the list
+    stack = [(tree, owner, None, None)]
+    while stack:
+        tree, parent, role, parent_index = stack.pop()
+        index = len(branches)
+        if isinstance(tree, _Node):
+            branch = suite.IfNode(parent)
+            branch.expression = _build_expression(tree.expression, branch)
+            stack.append((tree.else_, branch, '_else', index))
+            stack.append((tree.then, branch, 'then', index))
+        else:
+            assert isinstance(tree, _Action)
+            branch = suite.IfAction(parent)
+            branch.action = suite.Action(parent)
+        branches.append((tree, branch, parent, role))
+        children.append([])
+        if parent_index is not None:
+            children[parent_index].append(index)
+
+    # second pass: link the branches to their parent
+    for tree, branch, parent, role in branches:
+        if role is not None:
+            setattr(parent, role, branch)
+
+    # graphical part, only for graphical diagrams
+    if isinstance(diagram, suite.NetDiagram):
+        # the presentation elements are added in post-order, then, else, and node:
+        # reverse the pre-order traversal that visits else before then
+        order = []
+        stack = [0]
+        while stack:
+            index = stack.pop()
+            order.append(index)
+            stack.extend(children[index])
+        pairs = [branches[_][:2] for _ in reversed(order)]
+        _add_if_tree_pes(pairs, diagram)
+
+    # root of the tree
+    return branches[0][1]
+
+
+def _add_if_tree_pes(branches: List[Tuple[IfTree, suite.IfBranch]], diagram: suite.NetDiagram):
+    """
+    Add the presentation elements of the branches built from an if tree.
 
-        return ia
+    The elements are added in the order of the pairs (tree, branch).
+    """
+    # loop invariants
+    data_def = diagram.data_def
+    if_node_ge = suite.IfNodeGE
+    action_ge = suite.ActionGE
+    pes = []
+    for tree, branch in branches:
+        if isinstance(tree, _Node):
+            pe = if_node_ge(data_def)
+            # graphical properties
+            pe.position = _num_to_str(tree.position)
+            pe.label_width = tree.label_width
+            branch.presentation_element = pe
+        else:
+            pe = action_ge(data_def)
+            # graphical properties
+            pe.position = _num_to_str(tree.position)
+            pe.size = _num_to_str(tree.size)
+            if tree.display is DK.SPLIT:
+                add_data_def_net_diagram(branch.action, tree.name)
+            pe.display = _display_values[tree.display]
+            branch.action.presentation_element = pe
+        pes.append(pe)
+    diagram.presentation_elements.extend(pes)
 
 
 def create_if_action(
@@ -1241,14 +1451,12 @@ def add_data_def_if_block(
     """
     _check_object(data_def, 'add_data_def_if_block', 'data_def', suite.DataDef)
     if diagram is not None:
-        _check_object(
-            diagram, 'add_data_def_if_block', 'diagram', (suite.NetDiagram, suite.TextDiagram)
-        )
+        _check_object(diagram, 'add_data_def_if_block', 'diagram', _diagram_classes)
 
     ib = suite.IfBlock(data_def)
     ib.name = name
     data_def.flows.append(ib)
-    ib.if_node = if_tree._build(ib, diagram)
+    ib.if_node = _build_if_tree(if_tree, ib, diagram)
 
     # graphical part
     pe = None  # default
@@ -1377,9 +1585,7 @@ def add_data_def_when_block(
     """
     _check_object(data_def, 'add_data_def_when_block', 'datadef', suite.DataDef)
     if diagram is not None:
-        _check_object(
-            diagram, 'add_data_def_when_block', 'diagram', (suite.NetDiagram, suite.TextDiagram)
-        )
+        _check_object(diagram, 'add_data_def_when_block', 'diagram', _diagram_classes)
 
     if not branches:
         raise ValueError('add_data_def_when_block: The block must have at least one branch')
@@ -1432,49 +1638,77 @@ def add_when_block_branches(
     List[suite.WhenBranch]
     """
     _check_object(when_block, 'add_when_block_branches', 'when_block', suite.WhenBlock)
+    if __debug__:
+        # check all the branches before creating any of them
+        # (the loop is removed with -O, like the checks)
+        for branch in branches:
+            _check_object(branch, 'add_when_block_branches', 'branch', WhenBranch)
+    if not branches:
+        # nothing to do: the block is not modified
+        return []
 
-    diagram = when_block.presentation_element.diagram if when_block.presentation_element else None
-
-    when_branches = []
-    for branch in branches:
-        _check_object(branch, 'add_when_block_branches', 'branch', WhenBranch)
-
+    when_branches = [None] * len(branches)
+    for index, branch in enumerate(branches):
         when_branch = suite.WhenBranch(when_block)
         when_block.when_branches.append(when_branch)
         when_branch.pattern = _build_expression(branch.pattern, when_branch)
         when_branch.action = suite.Action(when_block)
-        when_branches.append(when_branch)
-        _link_pendings()
+        when_branches[index] = when_branch
 
-        # graphical part: a bit complex since two PE for one branch
-        peb = None  # default
-        pea = None  # default
-        if diagram is not None:
-            if isinstance(diagram, suite.NetDiagram):
-                pew = when_block.presentation_element
-                peb = suite.WhenBranchGE(when_block)
-                pea = suite.ActionGE(when_block)
-                # graphical properties
-                # apply a fixed offset from the block's left and the action's top
-                # the following offsets are reversed engineered and rounded from model files
-                start = (pew.position[0] + pew.start_pos[0] + 80, branch.position[1] + 80)
-                peb.position = _num_to_str(start)
-                peb.label_width = branch.label_width
-                pea.position = _num_to_str(branch.position)
-                pea.size = _num_to_str(branch.size)
-                if branch.display == DK.SPLIT:
-                    name = when_branch.pattern.to_string()
-                    add_data_def_net_diagram(when_branch.action, name)
-                pea.display = branch.display.value
-                when_branch.presentation_element = peb
-                when_branch.action.presentation_element = pea
-                diagram.presentation_elements.append(peb)
-                diagram.presentation_elements.append(pea)
+    # link the patterns of all the branches at once:
+    # the patterns must be complete to name the diagrams of split branches,
+    # even in a deferred_links block
+    _link_pendings(force=True)
+
+    # graphical part, only for graphical diagrams
+    pew = when_block.presentation_element
+    diagram = pew.diagram if pew else None
+    if isinstance(diagram, suite.NetDiagram):
+        _add_when_branches_pes(when_block, diagram, branches, when_branches)
 
     _set_modified(when_block)
     return when_branches
 
 
+def _add_when_branches_pes(
+    when_block: suite.WhenBlock,
+    diagram: suite.NetDiagram,
+    branches: List[WhenBranch],
+    when_branches: List[suite.WhenBranch],
+):
+    """Add the presentation elements of when branches: a bit complex since two PE per branch."""
+    pew = when_block.presentation_element
+    # apply a fixed offset from the block's left and the action's top
+    # the following offsets are reversed engineered and rounded from model files
+    x = pew.position[0] + pew.start_pos[0] + 80
+    pes = []
+    # branches with a separate diagram, created once the presentation elements are added
+    splits = []
+    # loop invariants
+    when_branch_ge = suite.WhenBranchGE
+    action_ge = suite.ActionGE
+    for branch, when_branch in zip(branches, when_branches):
+        peb = when_branch_ge(when_block)
+        pea = action_ge(when_block)
+        # graphical properties
+        peb.position = list(_coords_to_str(x, branch.position[1] + 80))
+        peb.label_width = branch.label_width
+        pea.position = _num_to_str(branch.position)
+        pea.size = _num_to_str(branch.size)
+        if branch.display is DK.SPLIT:
+            splits.append(when_branch)
+        pea.display = _display_values[branch.display]
+        when_branch.presentation_element = peb
+        when_branch.action.presentation_element = pea
+        pes.append(peb)
+        pes.append(pea)
+    diagram.presentation_elements.extend(pes)
+
+    for when_branch in splits:
+        name = when_branch.pattern.to_string()
+        add_data_def_net_diagram(when_branch.action, name)
+
+
 # ----------------------------------------------------------------------------
 # equation sets
 
@@ -1502,10 +1736,11 @@ def add_diagram_equation_set(
     # make sure the elements can be added to the equation set
     if elements is None:
         elements = []
-    for index, element in enumerate(elements):
-        pe = element.presentation_element
-        if not pe or pe.diagram != diagram:
-            raise ValueError("%s: element #%d can't be added" % (diagram, index + 1))
+    pes = (_.presentation_element for _ in elements)
+    # first element not in the diagram, if any
+    index = next((i for i, pe in enumerate(pes) if not pe or pe.diagram != diagram), None)
+    if index is not None:
+        raise ValueError("%s: element #%d can't be added" % (diagram, index + 1))
 
     eqs = suite.EquationSet(diagram)
     eqs.name = name
@@ -52,6 +52,10 @@ class VK(Enum):
     PRIVATE = 'Private'
 
 
+_tree_diagram_kinds = ('Constants', 'Types', 'Sensors')
+"""Block kinds of the hidden tree diagrams of a package."""
+
+
 def create_package(
     owner: suite.Package, name: str, path: Path = None, visibility: VK = VK.PUBLIC
 ) -> suite.Package:
@@ -78,22 +82,17 @@ def create_package(
     -------
     suite.Package
     """
-
-    def add_tree_diagram(package, kind):
-        diagram = suite.TreeDiagram(package)
-        diagram.landscape = True
-        diagram.block_kind = kind
-        diagram.package = package
-
     _check_object(owner, 'create_package', 'owner', suite.Package)
 
     package = suite.Package(owner)
     package.name = name
     _scade_api.add(owner, 'package', package)
     # create the hidden diagrams for tree views
-    add_tree_diagram(package, 'Constants')
-    add_tree_diagram(package, 'Types')
-    add_tree_diagram(package, 'Sensors')
+    for kind in _tree_diagram_kinds:
+        diagram = suite.TreeDiagram(package)
+        diagram.landscape = True
+        diagram.block_kind = kind
+        diagram.package = package
 
     # other properties
     package.visibility = visibility.value
@@ -244,8 +243,10 @@ def create_enumeration(
 
     enum = suite.Enumeration(owner)
     constants = []
+    # loop invariants
+    constant_class = suite.Constant
     for value in values:
-        constant = suite.Constant(owner)
+        constant = constant_class(owner)
         constant.name = value
         constants.append(constant)
     enum.values = constants
@@ -278,6 +279,8 @@ def add_enumeration_values(type_: suite.NamedType, values: List[str], insert_bef
     """
     _check_object(type_, 'add_enumeration_values', 'type_', suite.NamedType)
 
+    # the definition of a type created in a deferred_links block must be set
+    _link_pendings(force=True)
     enum = type_.definition
     _check_object(enum, 'add_enumeration_values', 'type_', suite.Enumeration)
 
@@ -288,13 +291,16 @@ def add_enumeration_values(type_: suite.NamedType, values: List[str], insert_bef
                 index = value.value_range
                 break
 
+    # loop invariants
+    constant_class = suite.Constant
+    add = _scade_api.add
     for value in values:
-        constant = suite.Constant(enum)
+        constant = constant_class(enum)
         constant.name = value
         # workaround, use a string
         constant.value_range = str(index)
         index = index + 1
-        _scade_api.add(enum, 'value', constant)
+        add(enum, 'value', constant)
     _set_modified(type_)
 
 
@@ -643,15 +649,23 @@ def _add_operator_ios(
         index = len(ios)
 
     new_ios = []
+    # polymorphic types already retrieved or created by this call
+    generic_types = {}
+    # loop invariants
+    local_variable_class = suite.LocalVariable
+    append = ios.append
     for name, tree in vars:
-        if isinstance(tree, str) and len(tree) > 0 and tree[0] == "'":
-            type_ = _get_generic_type(operator, tree)
+        if isinstance(tree, str) and tree.startswith("'"):
+            type_ = generic_types.get(tree)
+            if type_ is None:
+                type_ = _get_generic_type(operator, tree)
+                generic_types[tree] = type_
         else:
             type_ = _build_type(tree, operator)
-        io = suite.LocalVariable(operator)
+        io = local_variable_class(operator)
         io.name = name
         io.interface_range = index
-        ios.append(io)
+        append(io)
         _object_link_type(io, type_)
 
         new_ios.append(io)
@@ -779,18 +793,23 @@ def add_operator_parameters(
     if insert_before is not None:
         _check_object(insert_before, 'add_operator_parameters', 'insert_before', suite.Constant)
         if insert_before.operator != operator:
-            raise IllegalIOError(add_operator_parameters, insert_before, 'parameter')
+            raise IllegalIOError('add_operator_parameters', insert_before, 'parameter')
         index = insert_before.parameter_range
     else:
         index = len(operator.parameters)
 
     new_parameters = []
+    # loop invariants
+    constant_class = suite.Constant
+    append = operator.parameters.append
+    # predefined type, shared by all the parameters
+    uint32 = _build_type('uint32', operator)
     for name in parameters:
-        parameter = suite.Constant(operator)
+        parameter = constant_class(operator)
         parameter.name = name
         parameter.parameter_range = index
-        operator.parameters.append(parameter)
-        _object_link_type(parameter, _build_type('uint32', operator))
+        append(parameter)
+        _object_link_type(parameter, uint32)
 
         new_parameters.append(parameter)
         index += 1
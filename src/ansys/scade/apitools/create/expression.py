@@ -54,6 +54,7 @@ Notes: The typing is relaxed in this module to ease the constructs.
 
 """
 
+from functools import lru_cache
 from typing import List, Tuple, Union
 
 import scade.model.suite as suite
@@ -202,6 +203,31 @@ class _Operator(_Call):
         return expr
 
 
+@lru_cache(maxsize=4096)
+def _get_literal_kind(literal: str) -> str:
+    """
+    Return the kind of a literal expressed as a string, or ``None`` if it is not valid.
+
+    The kind is the one of the corresponding ``ConstValue``, for example ``'Int'``
+    for ``'3_ui8'``. The scripts usually use a small set of literals, hence the cache.
+    """
+    if _is_bool(literal):
+        return 'Bool'
+    elif _is_int(literal):
+        # number with an optional suffix _i8, ui32, etc.
+        return 'Int'
+    elif _is_real(literal):
+        # number with an optional suffix _f32 or _f64
+        return 'Real'
+    elif len(literal) > 1 and literal[0] == "'":
+        # no additional verification on the syntax
+        return 'Char'
+    elif literal.isidentifier():
+        # used in projections only
+        return 'String'
+    return None
+
+
 def _normalize_tree(any: EX) -> ET:
     """Create expression tree instances from literals or SCADE objects."""
     if isinstance(any, ET):
@@ -225,20 +251,10 @@ def _normalize_tree(any: EX) -> ET:
     elif isinstance(any, float):
         return _Value(str(any), 'Real')
     elif isinstance(any, str):
-        if _is_bool(any):
-            return _Value(str(any), 'Bool')
-        elif _is_int(any):
-            # number with an optional suffix _i8, ui32, etc.
-            return _Value(any, 'Int')
-        elif _is_real(any):
-            # number with an optional suffix _f32 or _f64
-            return _Value(any, 'Real')
-        elif len(any) > 1 and any[0] == "'":
-            # no additional verification on the syntax
-            return _Value(any, 'Char')
-        elif any.isidentifier():
-            # used in projections only
-            return _Value(any, 'String')
+        kind = _get_literal_kind(any)
+        if kind is not None:
+            # new instance: the label of a tree can be modified
+            return _Value(any, kind)
 
     # fall through
     raise ExprSyntaxError('_normalize_tree', any)
@@ -1245,6 +1261,9 @@ class EmptyTreeError(Exception):
 
 
 def _is_int(number: str) -> bool:
+    # identifiers, such as projections, are not numbers: avoid raising exceptions
+    if number.isidentifier():
+        return False
     # trivial test first
     try:
         _ = int(number)
@@ -1264,6 +1283,12 @@ def _is_int(number: str) -> bool:
 
 
 def _is_real(number: str) -> bool:
+    # identifiers, such as projections, are not numbers: avoid raising exceptions,
+    # except for the special values accepted by float, possibly with a suffix,
+    # for example ``'inf'`` or ``'nan_f64'``
+    if number.isidentifier():
+        if number.split('_', 1)[0].lower() not in {'inf', 'infinity', 'nan'}:
+            return False
     # trivial test first
     try:
         _ = float(number)
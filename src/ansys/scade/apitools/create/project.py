@@ -284,8 +284,12 @@ def _create_empty_project(pathname: str, configuration: str, products: List[str]
 
 
 def _check_object(object_, context: str, name: str, classes: Tuple[Any, ...]):
-    """Check the type of a parameter and raise a ``TypeError`` if it is not correct."""
-    if not isinstance(object_, classes):
+    """
+    Check the type of a parameter and raise a ``TypeError`` if it is not correct.
+
+    The check is skipped when Python runs with optimizations, ``-O``.
+    """
+    if __debug__ and not isinstance(object_, classes):
         cls = type(object_).__name__
         # classes is either a type or a tuple of types
         if isinstance(classes, tuple):
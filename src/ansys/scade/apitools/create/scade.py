@@ -28,6 +28,7 @@ Provides helpers for SCADE model creation functions.
 * Type trees
 """
 
+from contextlib import contextmanager
 from enum import Enum
 from os.path import abspath, relpath
 from pathlib import Path
@@ -54,6 +55,21 @@ List of pending associations to be set once an object is built.
 * The list is reset by the ``link_pendings`` function.
 """
 
+_deferred_links = 0
+"""
+Nesting level of the ``deferred_links`` context managers.
+
+The pending links are not flushed while the level is not zero.
+"""
+
+_deferred_modified = set()
+"""
+Set of the objects modified while the links are deferred.
+
+The files defining these objects are tagged as modified once, when exiting
+the outermost ``deferred_links`` block.
+"""
+
 
 # ----------------------------------------------------------------------------
 # Interface
@@ -70,15 +86,58 @@ class Sfk(Enum):
 
 
 def save_all():
-    """Save all modified files of Scade models."""
+    """
+    Save all modified files of Scade models.
+
+    In a ``deferred_links`` block, the pending links are flushed and the
+    objects modified so far are tagged before saving the files.
+    """
     global _modified_files
 
+    if _deferred_links:
+        _flush_deferred()
     for unit in _modified_files:
         unit.save()
 
     _modified_files = set()
 
 
+@contextmanager
+def deferred_links():
+    """
+    Defer the resolution of the links until the end of the block.
+
+    The creation functions link the new objects, for example to their types,
+    once they are built, and tag their files as modified. This context manager
+    flushes these links and tags each modified object only once, when exiting
+    the outermost block, which saves time when a script creates many objects
+    in sequence.
+
+    The new objects are not linked to their types or references until
+    the end of the block, or until ``save_all`` is called.
+    The functions that read these links, such as ``add_when_block_branches``,
+    ``add_diagram_missing_edges``, or ``add_enumeration_values``, flush the
+    pending links beforehand.
+
+    Examples
+    --------
+    .. code:: python
+
+        with create.deferred_links():
+            for variable, expr in flows:
+                create.add_data_def_equation(operator, diagram, [variable], expr)
+    """
+    global _deferred_links
+
+    _deferred_links += 1
+    try:
+        yield
+    finally:
+        _deferred_links -= 1
+        if not _deferred_links:
+            _flush_deferred()
+
+
 def add_element_to_project(
     project: std.Project,
     element: suite.StorageElement,
@@ -415,24 +474,58 @@ def _add_pending_link(object_: suite.Object, role: str, link: suite.Object):
     _pending_links.append((object_, role, link))
 
 
-def _link_pendings():
-    """Flush the pending links buffer."""
+def _link_pendings(force: bool = False):
+    """
+    Flush the pending links buffer, unless the links are deferred.
+
+    Parameters
+    ----------
+    force : bool, default: False
+        Whether to flush the links even in a ``deferred_links`` block,
+        for the functions that read the links once they are set.
+    """
     global _pending_links
 
+    if _deferred_links and not force:
+        return
     for object_, role, link in _pending_links:
         _scade_api.set(object_, role, link)
     _pending_links = []
 
 
+def _flush_deferred():
+    """Flush the pending links and tag the objects modified in a ``deferred_links`` block."""
+    try:
+        _link_pendings(force=True)
+    finally:
+        # tag the objects even if a link fails, and never keep them for the next block
+        try:
+            for object_ in _deferred_modified:
+                _tag_modified(object_)
+        finally:
+            _deferred_modified.clear()
+
+
 def _set_modified(object_: suite.Object):
     r"""
     Tag the file defining the input object as modified.
 
+    The tagging is deferred in a ``deferred_links`` block.
+
     Parameters
     ----------
     object\_ : suite.Object
         Input object.
     """
+    if _deferred_links:
+        # the same objects are usually modified several times
+        _deferred_modified.add(object_)
+    else:
+        _tag_modified(object_)
+
+
+def _tag_modified(object_: suite.Object):
+    """Tag the file defining the input object as modified, regardless of the deferral."""
     global _modified_files
 
     unit = object_.defined_in
@@ -158,19 +158,25 @@ def _normalize_tree(any: TX) -> TT:
         return _Type(any)
     # predefined types
     if isinstance(any, str):
+        tree = _predefined_trees.get(any)
+        if tree is not None:
+            return tree
         if any == 'bool' or any == 'char':
-            return _Predefined(any)
+            tree = _Predefined(any)
         elif any == 'int' or any == 'real':
             # KCG 6.4 and earlier
-            return _Predefined(any)
+            tree = _Predefined(any)
         elif any in _numeric_types:
             # KCG 6.5 and greater
-            return _Predefined(any)
+            tree = _Predefined(any)
         elif any and any[0] == "'":
             raise _polymorphic_error('_normalize_tree', any)
 
         else:
             raise _syntax_error('_normalize_tree', any)
+        # the tree does not depend on the context: share it
+        _predefined_trees[any] = tree
+        return tree
 
     # fall through
     raise _syntax_error('_normalize_tree', any)
@@ -287,6 +293,14 @@ Cache for predefined types.
 * The value is the corresponding predefined type.
 """
 
+_predefined_trees = {}
+"""
+Cache for the type trees of the predefined types.
+
+* The key is a name.
+* The value is the corresponding type tree.
+"""
+
 _type_constraints = {}
 """
 Cache for type constraints.
@@ -36,6 +36,8 @@ to some expected result, nor easy to maintain.
 Anyways, the result models can be exmined after the execution of the tests, for a deep analysis.
 """
 
+import sys
+
 import pytest
 
 import ansys.scade.apitools.create as create
@@ -210,13 +212,20 @@ class TestCreateDataDef:
             src = left.definitions[0]
             create.add_diagram_edge(diagram, src, left, equation, index, points=[(0, 0), (0, 0)])
 
-        # output edges
-        for left, name in (l1, 'o1'), (l2, 'o2'):
+        # output edges: the index of the left variable is either searched or provided
+        output_edges = [(l1, 'o1', None, 1), (l2, 'o2', 1, 2)]
+        for left, name, left_index, expected in output_edges:
             # equation defining name
             dst = model.get_object_from_path('%s%s=' % (path, name))
             # must replace the expression, _null in the test model
             dst.right.reference = left
-            create.add_diagram_edge(diagram, equation, left, dst, 0)
+            edge = create.add_diagram_edge(diagram, equation, left, dst, 0, left_index=left_index)
+            # 1 based index
+            assert edge.left_var_index == expected
+
+        # wrong index of the left variable
+        with pytest.raises(ValueError):
+            create.add_diagram_edge(diagram, equation, l1, dst, 0, left_index=1)
 
         # compare the equations (semantics only)
         reference = model.get_object_from_path('P::DataFlows/SM1:Reference:l1=')
@@ -309,6 +318,26 @@ class TestCreateDataDef:
 
         create.save_all()
 
+    def test_add_data_def_textual_scope_equation(self, tmp_project_session):
+        # project/session must have been duplicated to a temporary directory
+        project, session = tmp_project_session
+        model = session.model
+        # hard-coded test: create an equation in a state displayed as text
+        path = 'P::DataFlows/SM2:Textual:'
+        scope = model.get_object_from_path(path)
+        assert create.DK(scope.presentation_element.display) == create.DK.TEXTUAL
+        diagram = scope.presentation_element.diagram
+        variable = create.add_data_def_locals(scope, [('textual', 'bool')])[0]
+        # create the equation with graphical information
+        equation = create.add_data_def_equation(
+            scope, diagram, [variable], True, (3000, 3000), (250, 300)
+        )
+        assert equation.to_string() == 'textual = true'
+        # the graphical information is ignored for scopes displayed as text
+        assert equation.presentation_element is None
+
+        create.save_all()
+
     def test_add_data_def_misc_equation(self, tmp_project_session):
         # project/session must have been duplicated to a temporary directory
         project, session = tmp_project_session
@@ -539,6 +568,36 @@ class TestCreateDataDef:
 
         create.save_all()
 
+    def test_data_def_if_block_deep(self, tmp_project_session):
+        # project/session must have been duplicated to a temporary directory
+        project, session = tmp_project_session
+        scope = session.model.get_object_from_path('P::IfBlocks/')
+        diagram = next((_ for _ in scope.diagrams if _.name == 'NetDiagram'))
+        a = session.model.get_object_from_path('P::IfBlocks/a/')
+        # decision tree deeper than the recursion limit
+        depth = sys.getrecursionlimit() + 10
+        position = (500, 7000)
+        size = (4000, 1000)
+        tree = create.create_if_action(position, size)
+        for _ in range(depth):
+            else_ = create.create_if_action(position, size)
+            tree = create.create_if_tree(a, tree, else_, position)
+        block = create.add_data_def_if_block(scope, 'IBDeep', tree, diagram, position, size)
+        # walk the then branches
+        node = block.if_node
+        count = 0
+        while isinstance(node, suite.IfNode):
+            node = node.then
+            count += 1
+        assert count == depth
+        # the presentation elements of the tree are added in post-order: root last,
+        # just before the one of the block
+        pes = diagram.presentation_elements
+        assert pes[-1] == block.presentation_element
+        assert pes[-2] == block.if_node.presentation_element
+
+        create.save_all()
+
     diagram_equation_set_data = [
         ('P::EquationSets/', 'NetDiagram', 'a, b', ['a', 'b'], None),
         ('P::EquationSets/', 'TextDiagram', 'd', ['d'], TypeError),
@@ -578,3 +637,91 @@ class TestCreateDataDef:
                 assert eqs in equation.equation_sets
 
         create.save_all()
+
+    def test_deferred_links_nested(self, tmp_project_session):
+        # project/session must have been duplicated to a temporary directory
+        project, session = tmp_project_session
+        scope = session.model.get_object_from_path('P::DataFlows/')
+        with create.deferred_links():
+            with create.deferred_links():
+                variable = create.add_data_def_locals(scope, [('deferredNested', 'int32')])[0]
+            # exiting the inner block does not flush the links
+            assert variable.type is None
+        # exiting the outermost block flushes the links
+        assert variable.type.name == 'int32'
+
+        create.save_all()
+
+    def test_deferred_links_exception(self, tmp_project_session):
+        # project/session must have been duplicated to a temporary directory
+        project, session = tmp_project_session
+        scope = session.model.get_object_from_path('P::DataFlows/')
+        with pytest.raises(ValueError):
+            with create.deferred_links():
+                variable = create.add_data_def_locals(scope, [('deferredRaise', 'bool')])[0]
+                raise ValueError('interrupted')
+        # the links are flushed even when the block exits with an exception
+        assert variable.type.name == 'bool'
+        # the links are no longer deferred
+        variable = create.add_data_def_locals(scope, [('deferredAfter', 'bool')])[0]
+        assert variable.type.name == 'bool'
+
+        create.save_all()
+
+    def test_deferred_links_when_block(self, tmp_project_session):
+        # project/session must have been duplicated to a temporary directory
+        project, session = tmp_project_session
+        scope = session.model.get_object_from_path('P::WhenBlocks/')
+        diagram = next((_ for _ in scope.diagrams if _.name == 'NetDiagram'))
+        e = session.model.get_object_from_path('P::WhenBlocks/e/')
+        pattern = e.type.type.values[0]
+        branch = create.create_when_branch(
+            pattern.name, (2300, 9000), (4000, 1000), create.DK.SPLIT
+        )
+        with create.deferred_links():
+            block = create.add_data_def_when_block(
+                scope, 'WBDeferred', e, [branch], diagram, (500, 8500), (11000, 2000)
+            )
+            when_branch = block.when_branches[0]
+            # the pattern is linked even in the block, to name the split diagram
+            assert when_branch.pattern.reference == pattern
+            assert when_branch.action.diagrams[0].name == when_branch.pattern.to_string()
+
+        create.save_all()
+
+    def test_deferred_links_save_all(self, tmp_project_session):
+        # project/session must have been duplicated to a temporary directory
+        project, session = tmp_project_session
+        scope = session.model.get_object_from_path('P::DataFlows/')
+        with create.deferred_links():
+            variable = create.add_data_def_locals(scope, [('deferredSaved', 'int32')])[0]
+            # saving the files flushes the links and the modifications
+            create.save_all()
+            assert variable.type.name == 'int32'
+
+    def test_add_data_def_internals(self, tmp_project_session):
+        # project/session must have been duplicated to a temporary directory
+        project, session = tmp_project_session
+        model = session.model
+        path = 'P::DataFlows/'
+        scope = model.get_object_from_path(path)
+        diagram = next((_ for _ in scope.diagrams if _.name == 'TextDiagram'))
+        # several internal variables in the same scope
+        lefts = []
+        for value in range(3):
+            equation = create.add_data_def_equation(scope, diagram, ['int32'], value)
+            lefts.append(equation.lefts[0])
+        assert all(_.is_internal() for _ in lefts)
+        # rename an internal variable outside of the library to the next default name
+        names = {_.name for _ in scope.internals}
+        index = len(scope.internals) + 1
+        while '_L%d' % index in names:
+            index += 1
+        lefts[0].name = '_L%d' % index
+        equation = create.add_data_def_equation(scope, diagram, ['int32'], 3)
+        lefts.append(equation.lefts[0])
+        # the names must be unique
+        names = [_.name for _ in scope.internals]
+        assert len(names) == len(set(names))
+
+        create.save_all()
@@ -208,6 +208,17 @@ class TestCreateDeclaration:
         assert len(type_.type.values) == 2 + len(values)
         create.save_all()
 
+    def test_add_enumeration_values_deferred(self, tmp_project_session):
+        # project/session must have been duplicated to a temporary directory
+        project, session = tmp_project_session
+        owner = session.model.get_object_from_path('Package:')
+        with create.deferred_links():
+            type_ = create.create_enumeration(owner, 'DeferredEnumeration', ['ONE_D'], None)
+            # the definition of the type is linked before adding the values
+            create.add_enumeration_values(type_, ['TWO_D'], None)
+            assert [_.name for _ in type_.type.values] == ['ONE_D', 'TWO_D']
+        create.save_all()
+
     nominal_constant_data = [
         ('PACKAGE_INT32', 'Package:', 'int32', 42, None),
         ('ROOT_DEFAULT', '', 'bool', False, None),
@@ -30,7 +30,13 @@ be used for real scripts.
 import pytest
 
 import ansys.scade.apitools.create as create
-from ansys.scade.apitools.create.expression import EX, _build_expression, _normalize_tree
+from ansys.scade.apitools.create.expression import (
+    EX,
+    _build_expression,
+    _is_int,
+    _is_real,
+    _normalize_tree,
+)
 from ansys.scade.apitools.create.scade import _link_pendings, suite
 
 
@@ -754,6 +760,34 @@ def test_normalize_tree_value(tree, expected_value, expected_kind):
             _ = _normalize_tree(tree)
 
 
+literal_kind_data = [
+    # numbers
+    ('1', True, True),
+    ('-2_i32', True, False),
+    ('3.14', False, True),
+    ('1.2_f32', False, True),
+    # special values accepted by float
+    ('inf', False, True),
+    ('Infinity', False, True),
+    ('nan', False, True),
+    ('inf_f32', False, True),
+    ('nan_f64', False, True),
+    # identifiers
+    ('a', False, False),
+    ('a_i8', False, False),
+    ('a_f32', False, False),
+    ('inf_i8', False, False),
+    ('information', False, False),
+]
+ids = [_[0] for _ in literal_kind_data]
+
+
+@pytest.mark.parametrize('literal, is_int, is_real', literal_kind_data, ids=ids)
+def test_is_int_is_real(literal: str, is_int: bool, is_real: bool):
+    assert _is_int(literal) == is_int
+    assert _is_real(literal) == is_real
+
+
 # additional tests with Scade model elements
 normalize_tree_reference_data = [
     # nominal